@@ -13,7 +13,7 @@ import humanfriendly
 import typer
 
 import img_sanitizer
-from img_sanitizer.sanitizer import Sanitizer
+from img_sanitizer.sanitizer import HashAlgorithm, Sanitizer
 
 app = typer.Typer(help="Prepare, sanitize, and normalize JPEG images.")
 
@@ -66,25 +66,52 @@ def sanitize(
         4,
         "--worker",
         min=1,
-        help="Number of worker threads",
+        help="Number of worker processes",
     ),
     hash_sample_size_raw: str = typer.Option(
         None,
         "--hash-sample-size",
         help="Partial hash: only the first N bytes are hashed (e.g., 512K, 2MB, 1Mo). Full file if not set.",
     ),
+    hash_algorithm: Annotated[
+        HashAlgorithm,
+        typer.Option(
+            "--hash",
+            case_sensitive=False,
+            help="Digest used to name files. 'blake3' is faster but requires the optional 'blake3' package; keep 'sha1' for destinations created with it.",
+        ),
+    ] = HashAlgorithm.SHA1,
+    preserve_times: Annotated[
+        bool,
+        typer.Option(
+            "--preserve-times/--no-preserve-times",
+            help="Copy timestamps, permission bits and extended attributes of the source files.",
+        ),
+    ] = True,
 ) -> None:
     """Command that sanitizes images in `source` and writes to `dest`.
 
-    Files are renamed using a SHA-1 prefix, copied to `dest`, and
-    their EXIF metadata is stripped (retaining orientation/ICC when
-    present). Processing runs with multiple worker threads.
+    Files are renamed using a digest prefix (SHA-1 by default),
+    copied to `dest`, and their EXIF metadata is stripped (retaining
+    orientation/ICC when present). Processing runs with multiple
+    worker processes.
     """
     hash_sample_size = None
     if hash_sample_size_raw:
         hash_sample_size = humanfriendly.parse_size(hash_sample_size)
 
-    sanitizer = Sanitizer(source, dest, worker, hash_sample_size)
+    try:
+        sanitizer = Sanitizer(
+            source,
+            dest,
+            worker,
+            hash_sample_size,
+            hash_algorithm=hash_algorithm,
+            preserve_times=preserve_times,
+        )
+    except RuntimeError as e:
+        img_sanitizer.logger.error("%s", e)
+        raise typer.Exit(code=1) from e
 
     try:
         sanitizer.run()
@@ -0,0 +1,190 @@
+"""JPEG metadata stripping.
+
+This module rewrites the header of a JPEG stream in a single
+sequential pass. Metadata segments are dropped, except the ones
+needed to render the image faithfully: the orientation (kept in a
+minimal EXIF block), the ICC profile, and the JFIF and Adobe headers.
+Everything from the first scan onwards is copied verbatim.
+
+Only the length-prefixed header segments, a handful per file, are
+handled in Python; scan data is always copied in bulk, so there is no
+byte-level loop that would benefit from a compiled implementation.
+"""
+
+import struct
+from typing import BinaryIO, Protocol
+
+_SOI = b"\xff\xd8"
+_EOI = 0xD9
+_SOS = 0xDA
+_TEM = 0x01
+_RST0, _RST7 = 0xD0, 0xD7
+_APP0, _APP1, _APP2, _APP14, _APP15 = 0xE0, 0xE1, 0xE2, 0xEE, 0xEF
+_COM = 0xFE
+
+_EXIF_HEADER = b"Exif\x00\x00"
+_TIFF_MAGIC = 42
+_ORIENTATION_TAG = 0x0112
+_SHORT = 3
+
+_BUFFER_SIZE = 1 << 20
+
+
+class _Reader(Protocol):
+    """Binary stream interface needed from the JPEG source."""
+
+    def read(self, size: int = -1, /) -> bytes: ...
+
+    def readinto(self, buffer: bytearray | memoryview, /) -> int: ...
+
+
+def strip_metadata(src: _Reader, out: BinaryIO, buf: bytearray | None = None) -> None:
+    """Copy the JPEG read from `src` to `out` without its metadata.
+
+    The header is rewritten by `strip_header`, then the rest of the
+    stream is copied unchanged, through `buf` when given so callers
+    can reuse their own I/O buffer. When the image ends before any
+    scan, whatever follows is still read to the end but not written,
+    so a hashing `src` sees the whole file. Raises `ValueError` when
+    `src` is not a well-formed JPEG; `out` may then hold a partial
+    copy.
+    """
+    buf = buf or bytearray(_BUFFER_SIZE)
+    if strip_header(src, out):
+        copy_remaining(src, out, buf)
+    else:
+        _skip_remaining(src, buf)
+
+
+def strip_header(src: _Reader, out: BinaryIO) -> bool:
+    """Copy the JPEG header read from `src` to `out` without its metadata.
+
+    Header segments are read one at a time and either written, dropped
+    or, for EXIF, replaced with a block holding only the orientation.
+    Returns `True` once the start-of-scan segment has been written,
+    with `src` positioned at the scan data the caller still has to
+    copy, or `False` when the image ended before any scan. Raises
+    `ValueError` when `src` is not a well-formed JPEG.
+    """
+    if src.read(2) != _SOI:
+        raise ValueError("not a JPEG file")
+    out.write(_SOI)
+
+    while True:
+        prefix = _read_exact(src, 2)
+        if prefix[0] != 0xFF:
+            raise ValueError("invalid JPEG marker")
+        marker = prefix[1]
+        while marker == 0xFF:  # fill bytes before a marker
+            marker = _read_exact(src, 1)[0]
+
+        if marker in (_TEM, _EOI) or _RST0 <= marker <= _RST7:
+            out.write(bytes((0xFF, marker)))
+            if marker == _EOI:
+                return False
+            continue
+
+        length = int.from_bytes(_read_exact(src, 2), "big")
+        if length < 2:
+            raise ValueError("invalid JPEG segment length")
+        payload = _read_exact(src, length - 2)
+
+        if marker == _SOS:
+            _write_segment(out, marker, payload)
+            return True
+
+        kept = _filter_segment(marker, payload)
+        if kept is not None:
+            _write_segment(out, marker, kept)
+
+
+def _filter_segment(marker: int, payload: bytes) -> bytes | None:
+    """Return the payload to write for a header segment, or `None`."""
+    if marker == _APP0:
+        return payload if payload.startswith(b"JFIF\x00") else None
+    if marker == _APP1:
+        return _minimal_exif(payload) if payload.startswith(_EXIF_HEADER) else None
+    if marker == _APP2:
+        return payload if payload.startswith(b"ICC_PROFILE\x00") else None
+    if marker == _APP14:
+        return payload if payload.startswith(b"Adobe") else None
+    if _APP0 <= marker <= _APP15 or marker == _COM:
+        return None
+    return payload
+
+
+def _minimal_exif(payload: bytes) -> bytes | None:
+    """Rebuild an EXIF payload keeping only the orientation tag.
+
+    Returns `None` when the original block has no orientation or
+    cannot be parsed, in which case the segment is dropped entirely.
+    """
+    orientation = _read_orientation(payload[len(_EXIF_HEADER) :])
+    if orientation is None:
+        return None
+
+    # Big-endian TIFF header, then an IFD0 with a single SHORT entry.
+    return (
+        _EXIF_HEADER
+        + struct.pack(">2sHI", b"MM", _TIFF_MAGIC, 8)
+        + struct.pack(">HHHIHHI", 1, _ORIENTATION_TAG, _SHORT, 1, orientation, 0, 0)
+    )
+
+
+def _read_orientation(tiff: bytes) -> int | None:
+    """Return the orientation stored in the IFD0 of a TIFF block.
+
+    Only the first IFD is walked; `None` is returned when the tag is
+    missing, holds an out-of-range value or the block is malformed.
+    """
+    if tiff.startswith(b"II"):
+        order = "<"
+    elif tiff.startswith(b"MM"):
+        order = ">"
+    else:
+        return None
+
+    try:
+        magic, ifd_offset = struct.unpack_from(order + "HI", tiff, 2)
+        if magic != _TIFF_MAGIC:
+            return None
+        (count,) = struct.unpack_from(order + "H", tiff, ifd_offset)
+        for i in range(count):
+            entry = ifd_offset + 2 + 12 * i
+            tag, type_, n, value = struct.unpack_from(order + "HHIH", tiff, entry)
+            if tag == _ORIENTATION_TAG:
+                if type_ != _SHORT or n != 1 or not 1 <= value <= 8:
+                    return None
+                return int(value)
+    except struct.error:
+        return None
+    return None
+
+
+def _write_segment(out: BinaryIO, marker: int, payload: bytes) -> None:
+    """Write a length-prefixed segment to `out`."""
+    out.write(bytes((0xFF, marker)))
+    out.write((len(payload) + 2).to_bytes(2, "big"))
+    out.write(payload)
+
+
+def _read_exact(src: _Reader, size: int) -> bytes:
+    """Read exactly `size` bytes from `src` or raise `ValueError`."""
+    data = src.read(size)
+    if len(data) != size:
+        raise ValueError("truncated JPEG file")
+    return data
+
+
+def copy_remaining(src: _Reader, out: BinaryIO, buf: bytearray) -> None:
+    """Copy everything left in `src` to `out` through `buf`."""
+    view = memoryview(buf)
+    while n := src.readinto(view):
+        out.write(view[:n])
+
+
+def _skip_remaining(src: _Reader, buf: bytearray) -> None:
+    """Read and discard everything left in `src` through `buf`."""
+    view = memoryview(buf)
+    while src.readinto(view):
+        pass
@@ -1,4 +1,5 @@
+from .destination import DestinationIndex
 from .image import Image
-from .report import Report
+from .report import Report, Status
 
-__all__ = ["Image", "Report"]
+__all__ = ["DestinationIndex", "Image", "Report", "Status"]
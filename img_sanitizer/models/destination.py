@@ -0,0 +1,28 @@
+"""Destination index model used by the sanitizer.
+
+This module defines the `DestinationIndex` dataclass which bundles
+what a scan of the destination directory learned about the files
+already sanitized, so that duplicates can be skipped without copying
+them again.
+"""
+
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class DestinationIndex:
+    """Immutable summary of the files present in the destination.
+
+    Attributes
+    - existing_hashes: short digests of the destination files
+    - known_signatures: source signatures recorded on destination files
+    - known_sizes: source sizes read back from `known_signatures`
+    - unsigned_files: short digest to path of destination files
+      lacking a source signature
+    """
+
+    existing_hashes: frozenset[str] = frozenset()
+    known_signatures: frozenset[str] = frozenset()
+    known_sizes: frozenset[int] = frozenset()
+    unsigned_files: Mapping[str, str] = field(default_factory=dict)
@@ -1,9 +1,9 @@
 """Image model used by the sanitizer.
 
 This module defines the lightweight `Image` dataclass which bundles
-the original file `path` with its computed `sha1` digest. Utility
+the original file `path` with its computed content `digest`. Utility
 properties expose the original filename, normalized extension and a
-12-character short SHA prefix used for destination file names.
+12-character short digest prefix used for destination file names.
 """
 
 from dataclasses import dataclass
@@ -16,11 +16,11 @@ class Image:
 
     Attributes
     - path: `pathlib.Path` referencing the original image file
-    - sha1: full SHA-1 hex digest of the file contents
+    - digest: full hex digest of the file contents (SHA-1 or BLAKE3)
     """
 
     path: Path
-    sha1: str
+    digest: str
 
     @property
     def filename(self) -> str:
@@ -34,5 +34,5 @@ class Image:
 
     @property
     def short_sha(self) -> str:
-        """Return the first 12 characters of the SHA-1 digest."""
-        return self.sha1[:12]
+        """Return the first 12 characters of the digest."""
+        return self.digest[:12]
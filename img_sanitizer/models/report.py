@@ -4,10 +4,15 @@ The `Report` object tracks counts of copied, ignored and failed
 files and renders a small summary table to a `rich` console.
 """
 
+import threading
+from typing import Literal
+
 from rich.align import Align
 from rich.console import Console
 from rich.table import Table
 
+Status = Literal["copied", "ignored", "failed"]
+
 
 class Report:
     """Small container for processing counters and display.
@@ -23,6 +28,21 @@ class Report:
         self.copied: int = 0
         self.failed: int = 0
         self._console = Console()
+        self._lock = threading.Lock()
+
+    def record(self, status: Status) -> None:
+        """Count one processed file under `status`.
+
+        The increment is done under a lock, so concurrent callers never
+        lose an update, including on free-threaded Python builds.
+        """
+        with self._lock:
+            if status == "copied":
+                self.copied += 1
+            elif status == "ignored":
+                self.ignored += 1
+            else:
+                self.failed += 1
 
     def display(self) -> None:
         """Render a short summary table to the configured console."""
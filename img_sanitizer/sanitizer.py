@@ -1,32 +1,359 @@
 """Sanitizer implementation.
 
 This module exposes the `Sanitizer` class which scans a source
-directory for JPEG images, renames them using a SHA-1 digest,
-copies them to a destination directory preserving relative
-structure, and strips most EXIF metadata while keeping useful
-fields such as orientation and ICC profile.
+directory for JPEG images, renames them using a content digest
+(SHA-1 by default, or BLAKE3 when the optional `blake3` package is
+installed), copies them to a destination directory preserving
+relative structure, and strips most EXIF metadata while keeping
+useful fields such as orientation and ICC profile.
 """
 
 import hashlib
+import io
+import mmap
+import os
 import re
 import shutil
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
+import uuid
+from collections.abc import Iterator, Mapping
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    as_completed,
+    wait,
+)
+from contextlib import contextmanager, suppress
+from enum import StrEnum
 from pathlib import Path
-from typing import Any
+from typing import BinaryIO, Protocol
 
-import piexif
 from rich.progress import (
     BarColumn,
     Progress,
     SpinnerColumn,
     TextColumn,
     TimeElapsedColumn,
-    track,
 )
 
 import img_sanitizer
-from img_sanitizer.models import Image, Report
+from img_sanitizer import jpeg
+from img_sanitizer.models import DestinationIndex, Image, Report, Status
+
+try:
+    import blake3
+
+    _HAS_BLAKE3 = True
+except ImportError:
+    _HAS_BLAKE3 = False
+
+
+_BUFFER_SIZE = 1 << 20
+_COPY_RANGE_SIZE = 1 << 30
+_MMAP_THRESHOLD = 8 << 20
+_thread_local = threading.local()
+
+_SIGNATURE_XATTR = "user.img_sanitizer.src_sig"
+
+_JPEG_SUFFIXES = (".jpg", ".jpeg")
+
+_HEX_DIGITS = frozenset("0123456789abcdef")
+_HASH_PATTERN = re.compile(r"(?:^\d+_)?([a-f0-9]{12})")
+_TEMP_PATTERN = re.compile(r"\.[a-f0-9]{32}\.tmp")
+
+
+class HashAlgorithm(StrEnum):
+    """Digest algorithms available to name destination files."""
+
+    SHA1 = "sha1"
+    BLAKE3 = "blake3"
+
+
+class _Hasher(Protocol):
+    """Subset of the `hashlib` interface shared by the supported digests."""
+
+    def update(self, data: bytes | memoryview, /) -> object: ...
+
+    def hexdigest(self) -> str: ...
+
+
+class _HashingReader:
+    """Binary reader feeding every byte it returns to a hasher."""
+
+    def __init__(self, raw: io.BufferedIOBase, hasher: _Hasher) -> None:
+        self._raw = raw
+        self._hasher = hasher
+
+    def read(self, size: int = -1, /) -> bytes:
+        data = self._raw.read(size)
+        self._hasher.update(data)
+        return data
+
+    def readinto(self, buffer: bytearray | memoryview, /) -> int:
+        n = self._raw.readinto(buffer)
+        self._hasher.update(memoryview(buffer)[:n])
+        return n
+
+
+def _read_buffer() -> bytearray:
+    """Return the I/O buffer owned by the calling thread.
+
+    The buffer is allocated once per thread and reused for every file
+    processed by that thread.
+    """
+    buf: bytearray | None = getattr(_thread_local, "buffer", None)
+    if buf is None:
+        buf = _thread_local.buffer = bytearray(_BUFFER_SIZE)
+    return buf
+
+
+def _fadvise(f: BinaryIO, advice_name: str) -> None:
+    """Pass an access-pattern hint for the whole of `f` to the kernel.
+
+    `advice_name` is the name of an `os.POSIX_FADV_*` constant. This is
+    a no-op on platforms without `posix_fadvise`.
+    """
+    advice = getattr(os, advice_name, None)
+    if advice is None or not hasattr(os, "posix_fadvise"):
+        return
+    with suppress(OSError):
+        os.posix_fadvise(f.fileno(), 0, 0, advice)
+
+
+@contextmanager
+def _open_source(path: Path, drop_cache: bool = True) -> Iterator[io.BufferedReader]:
+    """Open a file to be read once, front to back.
+
+    The kernel is told to read ahead aggressively, then, if
+    `drop_cache` is true, to drop the file's pages before it is closed
+    so that large batches do not push everything else out of the page
+    cache. Pass false when the file is about to be read again.
+    """
+    with path.open("rb") as f:
+        _fadvise(f, "POSIX_FADV_SEQUENTIAL")
+        try:
+            yield f
+        finally:
+            if drop_cache:
+                _fadvise(f, "POSIX_FADV_DONTNEED")
+
+
+@contextmanager
+def _open_destination(path: Path) -> Iterator[io.BufferedWriter]:
+    """Create a file that will be written sequentially."""
+    with path.open("xb") as out:
+        _fadvise(out, "POSIX_FADV_SEQUENTIAL")
+        yield out
+
+
+def _hash_mapped(f: io.BufferedReader, hasher: _Hasher) -> None:
+    """Feed the whole of `f` to `hasher` through a read-only mapping.
+
+    The digest is computed straight from the page cache, without
+    copying the file into a buffer first.
+    """
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        advice = getattr(mmap, "MADV_SEQUENTIAL", None)
+        if advice is not None:
+            mm.madvise(advice)
+        with memoryview(mm) as view:
+            hasher.update(view)
+
+
+def _copy_rest(
+    src: io.BufferedReader,
+    out: io.BufferedWriter,
+    buf: bytearray,
+    kernel_copy: bool = True,
+) -> None:
+    """Copy everything left in `src` to `out`.
+
+    Unless `kernel_copy` is false, `os.copy_file_range` is tried
+    first: the data then never reaches user space, and filesystems
+    that support it (NFS server-side copy, Btrfs/XFS reflinks) can
+    avoid copying it at all. Any failure, such as `EXDEV` across
+    filesystems, falls back to `jpeg.copy_remaining` from wherever the
+    kernel copy stopped.
+    """
+    if kernel_copy and hasattr(os, "copy_file_range"):
+        offset = src.tell()
+        out.flush()
+        try:
+            while n := os.copy_file_range(
+                src.fileno(), out.fileno(), _COPY_RANGE_SIZE, offset_src=offset
+            ):
+                offset += n
+        except OSError as e:
+            img_sanitizer.logger.debug("copy_file_range unavailable : %s", e)
+        src.seek(offset)
+    jpeg.copy_remaining(src, out, buf)
+
+
+def _same_filesystem(source: Path, dest: Path) -> bool:
+    """Tell whether `dest` is, or will be created, on the device of `source`.
+
+    When `dest` does not exist yet its nearest existing parent is
+    checked instead. Returns `False` when either cannot be stat'ed.
+    """
+    try:
+        device = source.stat().st_dev
+        for path in (dest, *dest.absolute().parents):
+            if path.exists():
+                return path.stat().st_dev == device
+    except OSError:
+        pass
+    return False
+
+
+def _iter_files(root: Path, exclude: Path | None = None) -> Iterator[os.DirEntry[str]]:
+    """Yield the directory entries of all files below `root`.
+
+    The tree is walked with `os.scandir` and an explicit stack, so no
+    `Path` object is built per entry. Symlinked directories are not
+    followed, and directories that cannot be listed (including a
+    missing `root`) are skipped, like `Path.rglob`. The `exclude`
+    directory, when it lies below `root`, is not descended into.
+    """
+    excluded = _dir_identity(exclude) if exclude is not None else None
+    stack = [os.fspath(root)]
+    while stack:
+        path = stack.pop()
+        try:
+            it = os.scandir(path)
+        except OSError as e:
+            img_sanitizer.logger.debug("Cannot list %s : %s", path, e)
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if not _is_excluded(entry, excluded):
+                        stack.append(entry.path)
+                elif entry.is_file():
+                    yield entry
+
+
+def _dir_identity(path: Path) -> tuple[int, int] | None:
+    """Return the device and inode of `path`, or `None` if it is missing."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+def _is_excluded(entry: os.DirEntry[str], excluded: tuple[int, int] | None) -> bool:
+    """Tell whether the directory `entry` is the one identified by `excluded`.
+
+    The inode comes with the directory listing, so `entry` is only
+    stat'ed when it matches.
+    """
+    if excluded is None or entry.inode() != excluded[1]:
+        return False
+    try:
+        return entry.stat(follow_symlinks=False).st_dev == excluded[0]
+    except OSError:
+        return False
+
+
+def _iter_jpegs(root: Path, exclude: Path | None = None) -> Iterator[str]:
+    """Yield the paths of all JPEG files below `root` as strings.
+
+    The `exclude` directory is skipped, see `_iter_files`.
+    """
+    for entry in _iter_files(root, exclude):
+        if entry.name.lower().endswith(_JPEG_SUFFIXES):
+            yield entry.path
+
+
+def _existing_hash(filename: str) -> str | None:
+    """Return the short digest encoded in a destination file name.
+
+    Names produced by this tool are exactly `{12 hex}.ext` and are
+    checked directly; anything else (such as legacy `N_hex` names)
+    falls back to the regular expression.
+    """
+    stem = filename.rsplit(".", 1)[0].lower()
+    if len(stem) == 12 and _HEX_DIGITS.issuperset(stem):
+        return stem
+    match = _HASH_PATTERN.search(stem)
+    return match.group(1) if match else None
+
+
+def _temp_name() -> str:
+    """Return a fresh name for a file being written to the destination."""
+    return f".{uuid.uuid4().hex}.tmp"
+
+
+def _remove_stale_temp(entry: os.DirEntry[str]) -> bool:
+    """Delete `entry` if it is a temporary file left by an earlier run.
+
+    Such files are only left behind when a run is interrupted; they
+    must not be mistaken for sanitized images when the destination is
+    scanned. Returns whether `entry` was a temporary file.
+    """
+    if not _TEMP_PATTERN.fullmatch(entry.name):
+        return False
+    img_sanitizer.logger.warning("Removing stale temporary file %s", entry.path)
+    with suppress(OSError):
+        os.unlink(entry.path)
+    return True
+
+
+def _sign_existing(
+    short_sha: str, signature: str, unsigned_files: Mapping[str, str]
+) -> None:
+    """Store `signature` on the unsigned destination file for `short_sha`.
+
+    Nothing is written when the matching destination file carried a
+    signature when the destination was scanned, i.e. is not listed in
+    `unsigned_files`. That map is a snapshot shared by every worker,
+    so the signature is only created, never replaced: the first
+    duplicate found during a run signs the file and later ones keep
+    that signature.
+    """
+    path = unsigned_files.get(short_sha)
+    if path is not None:
+        _write_signature(path, signature, replace=False)
+
+
+def _read_signature(path: str | Path) -> str | None:
+    """Return the source signature stored on a destination file.
+
+    Signatures are kept in an extended attribute; `None` is returned
+    when the file has none or the platform/filesystem lacks xattrs.
+    """
+    if not hasattr(os, "getxattr"):
+        return None
+    try:
+        return os.getxattr(path, _SIGNATURE_XATTR).decode(errors="replace")
+    except OSError:
+        return None
+
+
+def _signature_size(signature: str) -> int | None:
+    """Return the source size recorded in a signature, if well-formed."""
+    size, _, _ = signature.partition(":")
+    return int(size) if size.isdigit() else None
+
+
+def _write_signature(path: str | Path, signature: str, replace: bool = True) -> None:
+    """Store a source signature on a destination file, if supported.
+
+    With `replace` false, a signature already stored on the file is
+    kept as is.
+    """
+    if not hasattr(os, "setxattr"):
+        return
+    flags = 0 if replace else os.XATTR_CREATE
+    try:
+        os.setxattr(path, _SIGNATURE_XATTR, signature.encode(), flags)
+    except FileExistsError:
+        pass
+    except OSError as e:
+        img_sanitizer.logger.debug("Cannot store signature on %s : %s", path, e)
 
 
 class Sanitizer:
@@ -35,18 +362,38 @@ class Sanitizer:
     Parameters
     - source: directory containing images to sanitize
     - dest: target directory where sanitized images will be written
-    - worker: number of threads used when processing files
+    - worker: number of processes used when processing files
+    - hash_sample_size: only hash the first N bytes of each file
+    - hash_algorithm: digest used to name files; keep `sha1` for
+      destinations produced by earlier versions
+    - preserve_times: copy timestamps, permission bits and extended
+      attributes of the sources onto the sanitized files
     """
 
     def __init__(
-        self, source: Path, dest: Path, worker: int, hash_sample_size: int | None
+        self,
+        source: Path,
+        dest: Path,
+        worker: int,
+        hash_sample_size: int | None,
+        hash_algorithm: HashAlgorithm = HashAlgorithm.SHA1,
+        preserve_times: bool = True,
     ) -> None:
         """Initialize a new `Sanitizer` instance.
 
         The constructor records a start time and prepares a `Report`
         instance as well as a `rich` progress renderer used during
         the `run` phase.
+
+        Raises `RuntimeError` when BLAKE3 is requested but the `blake3`
+        package is not installed.
         """
+        if hash_algorithm == HashAlgorithm.BLAKE3 and not _HAS_BLAKE3:
+            raise RuntimeError(
+                "BLAKE3 hashing requires the 'blake3' package "
+                "(pip install img-sanitizer[blake3])"
+            )
+
         self.source = source
         self.dest = dest
         self.worker = worker
@@ -61,160 +408,374 @@ class Sanitizer:
             TextColumn("{task.completed}/{task.total}"),
             TimeElapsedColumn(),
             console=img_sanitizer.console,
+            refresh_per_second=4,
         )
 
         self._hash_sample_size: int | None = hash_sample_size
+        self._hash_algorithm = hash_algorithm
+        self._preserve_times = preserve_times
+        # Destination directory of each source directory seen so far,
+        # already created. Each worker process owns its instance.
+        self._dest_dirs: dict[Path, Path] = {}
+        # copy_file_range fails with EXDEV across filesystems on recent
+        # kernels, so only attempt it when both sides share a device.
+        self._kernel_copy = _same_filesystem(source, dest)
 
     def run(self) -> None:
         """Execute the sanitization pipeline.
 
         This scans the source directory for JPEG files, skips any
         files that appear to already exist in the destination (by
-        comparing computed SHA-1 prefixes), and processes files in
-        parallel using a thread pool.
+        comparing computed digest prefixes, or the source signature
+        recorded on a previous run), and processes files in
+        parallel using a process pool while the source is still being
+        scanned. Workers only return the outcome of each file; the
+        report is updated here, in the parent.
         """
         img_sanitizer.logger.debug("Hash sample size set to %s", self._hash_sample_size)
-        img_sanitizer.logger.info("Scanning source folder for images...")
-        files: list[Path] = [
-            f for f in self.source.rglob("*") if f.suffix.lower() in {".jpg", ".jpeg"}
-        ]
-        img_sanitizer.logger.info("Found %s image(s) in source folder.", len(files))
-
+        img_sanitizer.logger.debug("Hash algorithm set to %s", self._hash_algorithm)
+        img_sanitizer.logger.debug("Kernel copy enabled : %s", self._kernel_copy)
         img_sanitizer.logger.info("Scanning destination folder for existing files...")
-        hash_pattern = re.compile(r"(?:^\d+_)?([a-f0-9]{12})", re.IGNORECASE)
+        self.dest.mkdir(parents=True, exist_ok=True)
+        index = self._scan_destination()
+        img_sanitizer.logger.info(
+            "Found %s existing file(s) in destination.", len(index.existing_hashes)
+        )
 
+        with ProcessPoolExecutor(
+            max_workers=self.worker,
+            initializer=_init_worker,
+            initargs=(
+                self.source,
+                self.dest,
+                self._hash_sample_size,
+                self._hash_algorithm,
+                self._preserve_times,
+                index,
+                img_sanitizer.logger.getEffectiveLevel(),
+            ),
+        ) as executor:
+            img_sanitizer.logger.info("Scanning source folder for images...")
+            # The destination may live inside the source; its files are
+            # written while the source is still being scanned.
+            total = self._process_all(
+                executor, _iter_jpegs(self.source, exclude=self.dest)
+            )
+
+        img_sanitizer.logger.info("Scanned %s image(s) in source folder.", total)
+
+    def _scan_destination(self) -> DestinationIndex:
+        """Index the files already present in the destination directory.
+
+        Stale temporary files left by an interrupted run are removed
+        on the way; see `_remove_stale_temp`.
+        """
         existing_hashes: set[str] = set()
-
-        for f in self.dest.rglob("*"):
-            if f.is_file():
-                match = hash_pattern.search(f.stem)
-                if match:
-                    existing_hashes.add(match.group(1).lower())
-        img_sanitizer.logger.info(
-            "Found %s existing file(s) in destination.", len(existing_hashes)
+        known_signatures: set[str] = set()
+        known_sizes: set[int] = set()
+        unsigned_files: dict[str, str] = {}
+
+        for entry in _iter_files(self.dest):
+            if _remove_stale_temp(entry):
+                continue
+            short_sha = _existing_hash(entry.name)
+            if short_sha:
+                existing_hashes.add(short_sha)
+                signature = _read_signature(entry.path)
+                if signature:
+                    known_signatures.add(signature)
+                    size = _signature_size(signature)
+                    if size is not None:
+                        known_sizes.add(size)
+                else:
+                    unsigned_files.setdefault(short_sha, entry.path)
+
+        return DestinationIndex(
+            existing_hashes=frozenset(existing_hashes),
+            known_signatures=frozenset(known_signatures),
+            known_sizes=frozenset(known_sizes),
+            unsigned_files=unsigned_files,
         )
 
-        with ThreadPoolExecutor(max_workers=self.worker) as executor:
-            for _ in track(
-                executor.map(lambda f: self._process_file(f, existing_hashes), files),
-                total=len(files),
-                description="[bold blue]Processing images...",
-                console=self._progress.console,
-            ):
-                pass
+    def _process_all(self, executor: Executor, files: Iterator[str]) -> int:
+        """Submit `files` to `executor` and record outcomes as they finish.
 
-    def _process_file(self, src_path: Path, existing_hashes: set[str]) -> None:
-        """Process a single file: copy and sanitize EXIF.
+        Files are consumed lazily and at most `worker * 4` of them are
+        in flight at any time, so memory stays bounded whatever the
+        size of the tree and scanning overlaps with processing. The
+        progress total grows as files are discovered. Returns the
+        number of files submitted.
+        """
+        max_in_flight = self.worker * 4
+        pending: set[Future[tuple[Status, str]]] = set()
+        total = 0
 
-        The method computes a short SHA-1 digest used as the new
+        with self._progress as progress:
+            task = progress.add_task("Processing images...", total=0)
+
+            for src_path in files:
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._record(*future.result())
+                        progress.advance(task)
+
+                pending.add(executor.submit(_process_file_worker, src_path))
+                total += 1
+                progress.update(task, total=total)
+
+            for future in as_completed(pending):
+                self._record(*future.result())
+                progress.advance(task)
+
+        return total
+
+    def _process_file(self, src_path: Path, index: DestinationIndex) -> None:
+        """Process a single file and record its outcome in the `Report`."""
+        self._record(*self._sanitize_file(src_path, index))
+
+    def _record(self, status: Status, detail: str) -> None:
+        """Log the outcome of a processed file and update the `Report`.
+
+        `detail` is the destination path for copied files, the source
+        path for ignored files and the error message for failures.
+        """
+        if status == "copied":
+            img_sanitizer.logger.debug("Processed: %s", detail)
+        elif status == "ignored":
+            img_sanitizer.logger.debug("Ignored (digest exists): %s", detail)
+        else:
+            img_sanitizer.logger.error("Error on %s", detail)
+        self.report.record(status)
+
+    def _sanitize_file(
+        self, src_path: Path, index: DestinationIndex
+    ) -> tuple[Status, str]:
+        """Sanitize a single file: copy and clean EXIF.
+
+        The method computes a short digest used as the new
         filename, copies the file to the destination (preserving the
-        relative path) and attempts to clean EXIF metadata. Errors
-        are caught and reflected in the `Report`.
+        relative path) and cleans its EXIF metadata. Errors are
+        caught and returned as a `failed` outcome.
+
+        The copy is written to a temporary file, with its metadata
+        stripped on the way (see `_copy_image`), and only moved to its
+        final name once it is complete. When the full file is hashed,
+        hashing and copying share a single read of the source and a
+        duplicate's temporary file is simply discarded. Sources whose
+        size is in `index.known_sizes` (the sizes of already copied
+        sources) are likely duplicates, so they are hashed first instead
+        and only copied if their digest turns out to be new.
+
+        Files whose signature (see `_source_signature`) is in
+        `index.known_signatures` were already copied by a previous run
+        and are ignored without being read. The signature is stored on
+        every copied file for that purpose, and on the existing file a
+        duplicate was matched with when `index.unsigned_files` lists
+        it, so that archives built by older versions benefit on the
+        next run.
+
+        The `Report` is not touched so the method can run in a worker
+        process; see `_record`.
         """
         try:
-            sha1 = self._sha1_file(src_path, sample_size=self._hash_sample_size)
-            image = Image(path=src_path, sha1=sha1)
-
-            if image.short_sha in existing_hashes:
-                img_sanitizer.logger.debug("Ignored (SHA1 exists): %s", image.path)
-                self.report.ignored += 1
-                return
+            st = src_path.stat()
+            signature = self._source_signature(src_path, st)
+            if signature in index.known_signatures:
+                return "ignored", str(src_path)
+
+            tmp_path = self.dest / _temp_name()
+            try:
+                if (
+                    self._hash_sample_size is None
+                    and st.st_size not in index.known_sizes
+                ):
+                    digest = self._hash_and_copy(src_path, tmp_path)
+                    image = Image(path=src_path, digest=digest)
+
+                    if image.short_sha in index.existing_hashes:
+                        _sign_existing(image.short_sha, signature, index.unsigned_files)
+                        return "ignored", str(image.path)
+                else:
+                    # Keep the pages cached for the copy that may follow.
+                    digest = self._hash_file(
+                        src_path, sample_size=self._hash_sample_size, drop_cache=False
+                    )
+                    image = Image(path=src_path, digest=digest)
+
+                    if image.short_sha in index.existing_hashes:
+                        _sign_existing(image.short_sha, signature, index.unsigned_files)
+                        return "ignored", str(image.path)
+
+                    self._copy_image(src_path, tmp_path)
+
+                dst_path = self._destination_path(image)
+                os.replace(tmp_path, dst_path)
+                if self._preserve_times:
+                    shutil.copystat(src_path, dst_path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+            _write_signature(dst_path, signature)
+            return "copied", str(dst_path)
 
-            dst_path = self._copy_image(image)
-            self._clean_exif(dst_path)
+        except Exception as e:
+            return "failed", f"{src_path} : {e}"
+
+    def _source_signature(self, src_path: Path, st: os.stat_result) -> str:
+        """Return a cheap identity of a source file, given its `stat`.
+
+        The signature combines size, nanosecond mtime and the path
+        relative to the source directory, so it can be checked with a
+        single `stat` instead of hashing the file. It is stored on the
+        sanitized copies, so the mtime and path are only kept as a
+        SHA-1 digest: the original name and timestamp must not travel
+        with the published file. The size stays readable for
+        `_signature_size`.
+        """
+        relative_path = src_path.relative_to(self.source).as_posix()
+        origin = hashlib.sha1(f"{st.st_mtime_ns}:{relative_path}".encode())
+        return f"{st.st_size}:{origin.hexdigest()}"
+
+    def _new_hasher(self) -> _Hasher:
+        """Return a fresh hasher for the configured algorithm."""
+        if self._hash_algorithm == HashAlgorithm.BLAKE3:
+            hasher: _Hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+            return hasher
+        return hashlib.sha1()
+
+    def _hash_and_copy(self, src_path: Path, dst_path: Path) -> str:
+        """Copy `src_path` to `dst_path` and return the source digest as hex.
+
+        The source is read once, through the per-thread buffer: every
+        byte read is fed to the hasher, so the digest identifies the
+        original file, while the copy written to `dst_path` has its
+        metadata stripped by `jpeg.strip_metadata`. Raises `ValueError`
+        when the file is not a well-formed JPEG.
+        """
+        h = self._new_hasher()
 
-            img_sanitizer.logger.info("Processed: %s", dst_path)
-            self.report.copied += 1
+        with _open_source(src_path) as f, _open_destination(dst_path) as out:
+            jpeg.strip_metadata(_HashingReader(f, h), out, _read_buffer())
 
-        except Exception as e:
-            img_sanitizer.logger.error("Error on %s : %s", src_path, e)
-            self.report.failed += 1
+        digest = h.hexdigest()
+        img_sanitizer.logger.debug("Digest of %s : %s", src_path, digest)
+        return digest
 
-    def _sha1_file(
-        self, filepath: Path, buffer_size: int = 65536, sample_size: int | None = None
+    def _hash_file(
+        self, filepath: Path, sample_size: int | None = None, drop_cache: bool = True
     ) -> str:
-        """Compute and return the SHA-1 digest of a file as hex.
-
-        The digest is computed by reading the file in chunks to avoid
-        large memory usage for big images. The full hex digest is
+        """Compute and return the digest of a file as hex.
+
+        The file is read with `readinto` into a 1 MiB buffer that is
+        reused by every file hashed on the same thread, avoiding a new
+        `bytes` object per chunk. Full-file hashes of files of 8 MiB or
+        more are computed from a memory mapping instead; with BLAKE3 the
+        file is always mapped and hashed by `blake3` with its
+        multi-threaded SIMD implementation. The full hex digest is
         returned (the caller may truncate it for shorter file names).
 
         If `sample_size` provided, only the first `sample_size` bytes
         of the file are hashed. Useful for fast deduplication of large files.
         If None, the full file is hashed.
+
+        Set `drop_cache` to false when the file is copied right after,
+        so that the copy is served from the page cache; see
+        `_open_source`.
         """
-        h = hashlib.sha1()
+        if sample_size is None and self._hash_algorithm == HashAlgorithm.BLAKE3:
+            mapped = blake3.blake3(max_threads=blake3.blake3.AUTO)
+            mapped.update_mmap(filepath)
+            digest: str = mapped.hexdigest()
+            img_sanitizer.logger.debug("Digest of %s : %s", filepath, digest)
+            return digest
+
+        h = self._new_hasher()
+        buf = _read_buffer()
+        view = memoryview(buf)
         remaining = sample_size
 
-        with filepath.open("rb") as f:
-            while True:
-                chunk_size = (
-                    buffer_size if remaining is None else min(buffer_size, remaining)
-                )
-                chunk = f.read(chunk_size)
-                if not chunk:
-                    break
-                h.update(chunk)
-                if remaining is not None:
-                    remaining -= len(chunk)
-                    if remaining <= 0:
+        with _open_source(filepath, drop_cache=drop_cache) as f:
+            if sample_size is None and os.fstat(f.fileno()).st_size >= _MMAP_THRESHOLD:
+                _hash_mapped(f, h)
+            else:
+                while True:
+                    if remaining is not None and remaining < len(view):
+                        view = view[:remaining]
+                    n = f.readinto(view)
+                    if not n:
                         break
+                    h.update(view[:n])
+                    if remaining is not None:
+                        remaining -= n
+                        if remaining <= 0:
+                            break
+
+        digest = h.hexdigest()
+        img_sanitizer.logger.debug("Digest of %s : %s", filepath, digest)
+        return digest
+
+    def _copy_image(self, src_path: Path, dst_path: Path) -> None:
+        """Copy an image to `dst_path` while stripping its metadata.
+
+        Metadata is removed in the same pass as the copy by
+        `jpeg.strip_header`; the scan data that follows is copied by
+        `_copy_rest`, inside the kernel when source and destination
+        share a filesystem. Raises
+        `ValueError` when the file is not a well-formed JPEG.
+        """
+        with _open_source(src_path) as f, _open_destination(dst_path) as out:
+            if jpeg.strip_header(f, out):
+                _copy_rest(f, out, _read_buffer(), self._kernel_copy)
 
-        sha1 = h.hexdigest()
-        img_sanitizer.logger.debug("SHA1 of %s : %s", filepath, sha1)
-        return sha1
-
-    def _clean_exif(self, path: Path) -> None:
-        """Remove most EXIF tags while keeping orientation and ICC.
+    def _destination_path(self, image: Image) -> Path:
+        """Return the destination path of an image.
 
-        Loads EXIF via `piexif`, builds a minimal EXIF dict containing
-        only orientation and ICC profile (when present) and writes the
-        stripped metadata back into the file. Errors are caught and
-        reported.
+        The new name is built using the first 12 characters of the
+        digest, preserving the original file extension. The
+        relative path from source to the image is preserved in the
+        destination directory. Necessary directories are created the
+        first time a source directory is seen, then remembered.
         """
-        try:
-            exif_dict = piexif.load(str(path))
+        source_dir = image.path.parent
+        final_dir = self._dest_dirs.get(source_dir)
+        if final_dir is None:
+            final_dir = self.dest / source_dir.relative_to(self.source)
+            final_dir.mkdir(parents=True, exist_ok=True)
+            self._dest_dirs[source_dir] = final_dir
 
-            orientation = exif_dict["0th"].get(piexif.ImageIFD.Orientation)
-            icc_profile = exif_dict.get("ICC")
+        new_name = f"{image.short_sha}{image.extension}"
+        return final_dir / new_name
 
-            new_exif: dict[str, Any] = {
-                "0th": {},
-                "Exif": {},
-                "GPS": {},
-                "1st": {},
-                "Interop": {},
-                "thumbnail": None,
-            }
 
-            if orientation:
-                new_exif["0th"][piexif.ImageIFD.Orientation] = orientation
-            if icc_profile:
-                new_exif["ICC"] = icc_profile
+_worker_sanitizer: Sanitizer | None = None
+_worker_index = DestinationIndex()
 
-            exif_bytes = piexif.dump(new_exif)
-            piexif.insert(exif_bytes, str(path))
 
-        except Exception as e:
-            img_sanitizer.logger.error("Error on %s : %s", path, e)
-            self.report.failed += 1
-            return
+def _init_worker(
+    source: Path,
+    dest: Path,
+    hash_sample_size: int | None,
+    hash_algorithm: HashAlgorithm,
+    preserve_times: bool,
+    index: DestinationIndex,
+    log_level: int,
+) -> None:
+    """Prepare a worker process of the `Sanitizer.run` process pool.
 
-    def _copy_image(self, image: Image) -> Path:
-        """Copy an image to the destination with a new name.
+    Each worker builds its own `Sanitizer` and receives the destination
+    index once instead of with every submitted file.
+    """
+    global _worker_sanitizer, _worker_index
 
-        The new name is built using the first 12 characters of the
-        SHA-1 digest, preserving the original file extension. The
-        relative path from source to the image is preserved in the
-        destination directory. Necessary directories are created as
-        needed.
-        """
-        relative_dir = image.path.parent.relative_to(self.source)
-        final_dir = self.dest / relative_dir
-        final_dir.mkdir(parents=True, exist_ok=True)
+    img_sanitizer.logger.setLevel(log_level)
+    _worker_sanitizer = Sanitizer(
+        source, dest, 1, hash_sample_size, hash_algorithm, preserve_times
+    )
+    _worker_index = index
 
-        new_name = f"{image.short_sha}{image.extension}"
-        dst_path = final_dir / new_name
 
-        shutil.copy2(image.path, dst_path)
-        return dst_path
+def _process_file_worker(src_path: str) -> tuple[Status, str]:
+    """Sanitize one file inside a worker process and return its outcome."""
+    assert _worker_sanitizer is not None, "worker process not initialized"
+    return _worker_sanitizer._sanitize_file(Path(src_path), _worker_index)
@@ -0,0 +1,87 @@
+import io
+import struct
+
+import pytest
+
+from img_sanitizer import jpeg
+
+
+def segment(marker, payload):
+    return bytes((0xFF, marker)) + (len(payload) + 2).to_bytes(2, "big") + payload
+
+
+JFIF = segment(0xE0, b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00")
+ICC = segment(0xE2, b"ICC_PROFILE\x00\x01\x01profile")
+ADOBE = segment(0xEE, b"Adobe\x00\x64\x00\x00\x00\x00\x01")
+XMP = segment(0xE1, b"http://ns.adobe.com/xap/1.0/\x00<x:xmpmeta/>")
+IPTC = segment(0xED, b"Photoshop 3.0\x00secret")
+COMMENT = segment(0xFE, b"taken at home")
+DQT = segment(0xDB, b"\x00" + bytes(64))
+SCAN = segment(0xDA, b"\x01\x01\x00\x00\x3f\x00") + b"\x12\x34\xff\x00\x56\xff\xd9"
+
+
+def exif_segment(orientation=None, order=">"):
+    entries = [(0x010F, 2, 4, b"Cam\x00")]  # Make
+    if orientation:
+        entries.append((0x0112, 3, 1, struct.pack(order + "HH", orientation, 0)))
+    entries.append((0x8825, 4, 1, struct.pack(order + "I", 0)))  # GPS IFD
+    tiff = (b"II" if order == "<" else b"MM") + struct.pack(order + "HI", 42, 8)
+    tiff += struct.pack(order + "H", len(entries))
+    for tag, type_, count, value in entries:
+        tiff += struct.pack(order + "HHI", tag, type_, count) + value
+    tiff += struct.pack(order + "I", 0)
+    return segment(0xE1, b"Exif\x00\x00" + tiff)
+
+
+def strip(data):
+    out = io.BytesIO()
+    jpeg.strip_metadata(io.BytesIO(data), out)
+    return out.getvalue()
+
+
+def minimal_exif(orientation):
+    ifd = struct.pack(">HHHIHHI", 1, 0x0112, 3, 1, orientation, 0, 0)
+    return segment(0xE1, b"Exif\x00\x00MM\x00\x2a\x00\x00\x00\x08" + ifd)
+
+
+def test_strip_metadata_keeps_rendering_segments():
+    data = b"\xff\xd8" + JFIF + exif_segment(6) + XMP + ICC + IPTC
+    data += COMMENT + ADOBE + DQT + SCAN
+
+    got = strip(data)
+
+    assert got == b"\xff\xd8" + JFIF + minimal_exif(6) + ICC + ADOBE + DQT + SCAN
+
+
+def test_strip_metadata_reads_little_endian_exif():
+    data = b"\xff\xd8" + exif_segment(8, order="<") + DQT + SCAN
+
+    assert strip(data) == b"\xff\xd8" + minimal_exif(8) + DQT + SCAN
+
+
+@pytest.mark.parametrize(
+    "exif",
+    [
+        exif_segment(),
+        exif_segment(9),
+        segment(0xE1, b"Exif\x00\x00MM\x00\x2a\x00\x00\x01\x00"),
+        segment(0xE1, b"Exif\x00\x00XX"),
+    ],
+)
+def test_strip_metadata_drops_exif_without_orientation(exif):
+    data = b"\xff\xd8" + exif + DQT + SCAN
+
+    assert strip(data) == b"\xff\xd8" + DQT + SCAN
+
+
+def test_strip_metadata_handles_fill_bytes_and_eoi():
+    assert strip(b"\xff\xd8\xff" + COMMENT + b"\xff\xd9") == b"\xff\xd8\xff\xd9"
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"dummy", b"\xff\xd8" + DQT[:-3], b"\xff\xd8\x00\x00", b"\xff\xd8\xff\xdb\x00"],
+)
+def test_strip_metadata_rejects_malformed_files(data):
+    with pytest.raises(ValueError):
+        strip(data)
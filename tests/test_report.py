@@ -1,3 +1,5 @@
+import threading
+
 from img_sanitizer.models import Report
 
 
@@ -14,3 +16,19 @@ def test_report_display_outputs_table(capsys):
     assert "Copied files" in captured.out
     assert "Ignored files" in captured.out
     assert "Failed files" in captured.out
+
+
+def test_report_record_counts_concurrent_updates():
+    r = Report()
+
+    def record_many():
+        for status in ("copied", "ignored", "failed", "copied") * 1000:
+            r.record(status)
+
+    threads = [threading.Thread(target=record_many) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert (r.copied, r.ignored, r.failed) == (16000, 8000, 8000)
@@ -1,8 +1,20 @@
 import hashlib
-import shutil
+import os
+from pathlib import Path
 
-from img_sanitizer import cli
-from img_sanitizer.sanitizer import Sanitizer
+import pytest
+
+from img_sanitizer import cli, sanitizer
+from img_sanitizer.models import DestinationIndex
+from img_sanitizer.sanitizer import HashAlgorithm, Sanitizer
+
+# SOI, JFIF APP0, SOS with one byte of scan data, EOI
+JPEG = (
+    b"\xff\xd8"
+    b"\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+    b"\xff\xda\x00\x02\x00"
+    b"\xff\xd9"
+)
 
 
 def test_sha1_file(tmp_path):
@@ -13,12 +25,12 @@ def test_sha1_file(tmp_path):
     f.write_bytes(data)
 
     s = Sanitizer(src_dir, tmp_path / "dst", worker=1, hash_sample_size=None)
-    got = s._sha1_file(f)
+    got = s._hash_file(f)
     assert got == "2aae6c35c94fcfb415dbe95f408b9ce91ee846ed"
 
 
 def test_process_file_copies_and_names(tmp_path):
-    data = b"hello world"
+    data = JPEG
     src_dir = tmp_path / "src"
     dest_dir = tmp_path / "dst"
     src_dir.mkdir()
@@ -32,7 +44,7 @@ def test_process_file_copies_and_names(tmp_path):
     s = Sanitizer(src_dir, dest_dir, worker=1, hash_sample_size=None)
 
     # process the file directly
-    s._process_file(img, existing_hashes=set())
+    s._process_file(img, DestinationIndex())
 
     sha1 = hashlib.sha1(data).hexdigest()[:12]
     expected_path = dest_dir / "subdir" / f"{sha1}.jpg"
@@ -41,46 +53,36 @@ def test_process_file_copies_and_names(tmp_path):
     assert s.report.copied == 1
 
 
-def test_clean_exif_handles_piexif_error(tmp_path, monkeypatch):
-    # simulate piexif.load raising an error and ensure report increments
-    def fake_load(path):
-        raise ValueError("bad exif")
-
-    monkeypatch.setattr("img_sanitizer.sanitizer.piexif.load", fake_load)
-
-    img = tmp_path / "img.jpg"
+def test_process_file_fails_on_non_jpeg(tmp_path):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    img = src / "img.jpg"
     img.write_bytes(b"dummy")
 
-    s = Sanitizer(tmp_path, tmp_path / "dst", worker=1, hash_sample_size=None)
-    s._clean_exif(img)
+    s = Sanitizer(src, dst, worker=1, hash_sample_size=None)
+    s._process_file(img, DestinationIndex())
 
     assert s.report.failed == 1
+    assert s.report.copied == 0
+    assert list(dst.iterdir()) == []
 
 
-def test_clean_exif_calls_insert_with_minimal_exif(tmp_path, monkeypatch):
-    # verify piexif.insert is called with dumped bytes when load returns a dict
-    recorded = {}
-
-    def fake_load(path):
-        return {"0th": {}}
-
-    def fake_dump(exif_dict):
-        return b"exifbytes"
-
-    def fake_insert(exif_bytes, path):
-        recorded["inserted"] = exif_bytes
-
-    monkeypatch.setattr("img_sanitizer.sanitizer.piexif.load", fake_load)
-    monkeypatch.setattr("img_sanitizer.sanitizer.piexif.dump", fake_dump)
-    monkeypatch.setattr("img_sanitizer.sanitizer.piexif.insert", fake_insert)
-
-    img = tmp_path / "img.jpg"
-    img.write_bytes(b"dummy")
+def test_run_skips_dest_nested_in_source(tmp_path):
+    src = tmp_path / "photos"
+    dst = src / "clean"
+    (src / "a").mkdir(parents=True)
+    comment = b"\xff\xfe\x00\x0ftaken at home"
+    for i in range(5):
+        (src / "a" / f"{i}.jpg").write_bytes(JPEG[:2] + comment + JPEG[2:] + bytes([i]))
 
-    s = Sanitizer(tmp_path, tmp_path / "dst", worker=1, hash_sample_size=None)
-    s._clean_exif(img)
+    for _ in range(2):
+        s = Sanitizer(src, dst, worker=1, hash_sample_size=None)
+        s.run()
+        assert s.report.failed == 0
 
-    assert recorded.get("inserted") == b"exifbytes"
+    assert sorted(p.parent for p in dst.rglob("*.jpg")) == [dst / "a"] * 5
 
 
 def test_run_skips_existing(tmp_path):
@@ -92,11 +94,11 @@ def test_run_skips_existing(tmp_path):
 
     f1 = src / "a" / "one.jpg"
     f2 = src / "b" / "two.jpg"
-    f1.write_bytes(b"aaa")
-    f2.write_bytes(b"bbb")
+    f1.write_bytes(JPEG + b"a")
+    f2.write_bytes(JPEG + b"b")
 
     # create existing file in dest with sha1 of f1
-    sha1_f1 = hashlib.sha1(b"aaa").hexdigest()[:12]
+    sha1_f1 = hashlib.sha1(JPEG + b"a").hexdigest()[:12]
     existing = dst / "a"
     existing.mkdir(parents=True)
     (existing / f"{sha1_f1}.jpg").write_bytes(b"exists")
@@ -109,6 +111,26 @@ def test_run_skips_existing(tmp_path):
     assert s.report.copied >= 1
 
 
+def test_run_removes_stale_temp_files(tmp_path):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    (src / "one.jpg").write_bytes(JPEG)
+
+    # a temp file left by a crashed run, starting with the image's digest
+    digest = hashlib.sha1(JPEG).hexdigest()
+    stale = dst / f".{digest[:32]}.tmp"
+    stale.write_bytes(b"partial")
+
+    s = Sanitizer(src, dst, worker=1, hash_sample_size=None)
+    s.run()
+
+    assert s.report.copied == 1
+    assert not stale.exists()
+    assert [p.name for p in dst.iterdir()] == [f"{digest[:12]}.jpg"]
+
+
 def test_process_file_copy_error_increments_failed(tmp_path, monkeypatch):
     src = tmp_path / "src"
     dst = tmp_path / "dst"
@@ -120,12 +142,53 @@ def test_process_file_copy_error_increments_failed(tmp_path, monkeypatch):
     def boom(src, dst2):
         raise OSError("fail")
 
-    monkeypatch.setattr(shutil, "copy2", boom)
+    monkeypatch.setattr(os, "replace", boom)
 
     s = Sanitizer(src, dst, worker=1, hash_sample_size=None)
-    s._process_file(img, existing_hashes=set())
+    s._process_file(img, DestinationIndex())
+
+    assert s.report.failed == 1
+    assert s.report.copied == 0
+    assert list(dst.iterdir()) == []
+
+
+def test_process_file_sampled_copy_error_increments_failed(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    img = src / "bad.jpg"
+    img.write_bytes(b"data")
+
+    def boom(src, dst2):
+        raise OSError("fail")
+
+    monkeypatch.setattr(os, "replace", boom)
+
+    s = Sanitizer(src, dst, worker=1, hash_sample_size=2)
+    s._process_file(img, DestinationIndex())
 
     assert s.report.failed == 1
+    assert s.report.copied == 0
+    assert list(dst.iterdir()) == []
+
+
+def test_process_file_duplicate_leaves_no_temp_file(tmp_path):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    img = src / "dup.jpg"
+    img.write_bytes(JPEG)
+
+    s = Sanitizer(src, dst, worker=1, hash_sample_size=None)
+    index = DestinationIndex(
+        existing_hashes=frozenset({hashlib.sha1(JPEG).hexdigest()[:12]})
+    )
+    s._process_file(img, index)
+
+    assert s.report.ignored == 1
+    assert list(dst.iterdir()) == []
 
 
 def test_cli_sanitize_runs(tmp_path):
@@ -137,3 +200,340 @@ def test_cli_sanitize_runs(tmp_path):
 
     # call the CLI command directly
     cli.sanitize(src, dst, worker=1, hash_sample_size_raw=None)
+
+
+def test_sha1_file_sample_size(tmp_path):
+    f = tmp_path / "a.jpg"
+    f.write_bytes(b"hello world")
+
+    s = Sanitizer(tmp_path, tmp_path / "dst", worker=1, hash_sample_size=None)
+    got = s._hash_file(f, sample_size=5)
+    assert got == hashlib.sha1(b"hello").hexdigest()
+
+
+def test_sha1_file_larger_than_buffer(tmp_path):
+    data = bytes(range(256)) * 5000
+    f = tmp_path / "big.jpg"
+    f.write_bytes(data)
+
+    s = Sanitizer(tmp_path, tmp_path / "dst", worker=1, hash_sample_size=None)
+    assert s._hash_file(f) == hashlib.sha1(data).hexdigest()
+    assert s._hash_file(f, sample_size=1_100_000) == (
+        hashlib.sha1(data[:1_100_000]).hexdigest()
+    )
+
+
+def test_sha1_file_mapped_above_threshold(tmp_path, monkeypatch):
+    monkeypatch.setattr(sanitizer, "_MMAP_THRESHOLD", 1000)
+    data = bytes(range(256)) * 10
+    f = tmp_path / "big.jpg"
+    f.write_bytes(data)
+
+    s = Sanitizer(tmp_path, tmp_path / "dst", worker=1, hash_sample_size=None)
+    assert s._hash_file(f) == hashlib.sha1(data).hexdigest()
+    assert s._hash_file(f, sample_size=100) == hashlib.sha1(data[:100]).hexdigest()
+
+
+def test_process_file_skips_known_signature(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    img = src / "img.jpg"
+    img.write_bytes(JPEG)
+
+    s = Sanitizer(src, dst, worker=1, hash_sample_size=None)
+    s._process_file(img, DestinationIndex())
+
+    copied = dst / f"{hashlib.sha1(JPEG).hexdigest()[:12]}.jpg"
+    signature = sanitizer._read_signature(copied)
+    if signature is None:
+        pytest.skip("extended attributes not supported")
+    assert signature == s._source_signature(img, img.stat())
+    assert "img.jpg" not in signature
+    assert str(img.stat().st_mtime_ns) not in signature
+    assert sanitizer._signature_size(signature) == len(JPEG)
+
+    def boom(*args):
+        raise AssertionError("file should not be read")
+
+    monkeypatch.setattr(Sanitizer, "_hash_and_copy", boom)
+
+    s2 = Sanitizer(src, dst, worker=1, hash_sample_size=None)
+    s2._process_file(img, DestinationIndex(known_signatures=frozenset({signature})))
+
+    assert s2.report.ignored == 1
+
+
+def test_run_signs_legacy_destination_on_duplicate(tmp_path):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    img = src / "img.jpg"
+    img.write_bytes(JPEG)
+    # copied by an older version, which stored no signature
+    legacy = dst / f"{hashlib.sha1(JPEG).hexdigest()[:12]}.jpg"
+    legacy.write_bytes(JPEG)
+
+    probe = tmp_path / "probe"
+    probe.write_bytes(b"")
+    sanitizer._write_signature(probe, "0:0:probe")
+    if sanitizer._read_signature(probe) is None:
+        pytest.skip("extended attributes not supported")
+
+    s = Sanitizer(src, dst, worker=1, hash_sample_size=None)
+    s.run()
+
+    assert s.report.ignored == 1
+    signature = sanitizer._read_signature(legacy)
+    assert signature == s._source_signature(img, img.stat())
+
+
+def test_process_file_keeps_first_signature_on_legacy_destination(tmp_path):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    first = src / "a.jpg"
+    second = src / "b.jpg"
+    first.write_bytes(JPEG)
+    second.write_bytes(JPEG)
+    short_sha = hashlib.sha1(JPEG).hexdigest()[:12]
+    legacy = dst / f"{short_sha}.jpg"
+    legacy.write_bytes(JPEG)
+
+    sanitizer._write_signature(legacy, "0:0:probe")
+    if sanitizer._read_signature(legacy) is None:
+        pytest.skip("extended attributes not supported")
+    os.removexattr(legacy, sanitizer._SIGNATURE_XATTR)
+
+    s = Sanitizer(src, dst, worker=1, hash_sample_size=None)
+    # the index is a snapshot: it still lists the file once signed
+    index = DestinationIndex(
+        existing_hashes=frozenset({short_sha}),
+        unsigned_files={short_sha: str(legacy)},
+    )
+    s._process_file(first, index)
+    s._process_file(second, index)
+
+    assert s.report.ignored == 2
+    signature = sanitizer._read_signature(legacy)
+    assert signature == s._source_signature(first, first.stat())
+
+
+def test_hash_file_blake3(tmp_path):
+    blake3 = pytest.importorskip("blake3")
+
+    data = b"hello world"
+    f = tmp_path / "a.jpg"
+    f.write_bytes(data)
+
+    s = Sanitizer(
+        tmp_path,
+        tmp_path / "dst",
+        worker=1,
+        hash_sample_size=None,
+        hash_algorithm=HashAlgorithm.BLAKE3,
+    )
+    assert s._hash_file(f) == blake3.blake3(data).hexdigest()
+    assert s._hash_file(f, sample_size=5) == blake3.blake3(b"hello").hexdigest()
+
+
+def test_iter_jpegs_recurses_and_filters(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "top.JPG").write_bytes(b"")
+    (tmp_path / "a" / "mid.jpeg").write_bytes(b"")
+    (tmp_path / "a" / "b" / "deep.jpg").write_bytes(b"")
+    (tmp_path / "a" / "notes.txt").write_bytes(b"")
+    (tmp_path / "a" / "dir.jpg").mkdir()
+
+    found = sorted(sanitizer._iter_jpegs(tmp_path))
+
+    assert found == sorted(
+        str(p)
+        for p in (
+            tmp_path / "top.JPG",
+            tmp_path / "a" / "mid.jpeg",
+            tmp_path / "a" / "b" / "deep.jpg",
+        )
+    )
+
+
+def test_iter_jpegs_skips_unreadable_dirs(tmp_path, monkeypatch):
+    (tmp_path / "a" / "locked").mkdir(parents=True)
+    (tmp_path / "a" / "locked" / "hidden.jpg").write_bytes(b"")
+    (tmp_path / "b").mkdir()
+    (tmp_path / "b" / "x.jpg").write_bytes(b"")
+
+    scandir = os.scandir
+
+    def guarded_scandir(path):
+        if path == str(tmp_path / "a" / "locked"):
+            raise PermissionError(13, "Permission denied", path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", guarded_scandir)
+
+    assert list(sanitizer._iter_jpegs(tmp_path)) == [str(tmp_path / "b" / "x.jpg")]
+
+
+def test_existing_hash_parses_destination_names():
+    assert sanitizer._existing_hash("0123456789AB.jpg") == "0123456789ab"
+    assert sanitizer._existing_hash("3_abcdef012345.jpeg") == "abcdef012345"
+    assert sanitizer._existing_hash("12345678901234_abcdef012345.jpg") == (
+        "abcdef012345"
+    )
+    assert sanitizer._existing_hash("holiday.jpg") is None
+
+
+@pytest.mark.parametrize("sample_size", [None, 4])
+def test_process_file_strips_metadata_and_names_by_source(tmp_path, sample_size):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    data = JPEG[:2] + b"\xff\xfe\x00\x0ftaken at home" + JPEG[2:]
+    img = src / "img.jpg"
+    img.write_bytes(data)
+
+    s = Sanitizer(src, dst, worker=1, hash_sample_size=sample_size)
+    s._process_file(img, DestinationIndex())
+
+    digest = hashlib.sha1(data if sample_size is None else data[:sample_size])
+    copied = dst / f"{digest.hexdigest()[:12]}.jpg"
+    assert s.report.copied == 1
+    assert copied.read_bytes() == JPEG
+
+
+def test_process_file_sampled_copies_large_scan_data(tmp_path):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    body = bytes(range(256)) * 12_000
+    data = JPEG[:2] + b"\xff\xfe\x00\x0ftaken at home" + JPEG[2:-2] + body + b"\xff\xd9"
+    img = src / "img.jpg"
+    img.write_bytes(data)
+    os.utime(img, ns=(1_000_000_000, 1_000_000_000))
+
+    s = Sanitizer(src, dst, worker=1, hash_sample_size=64, preserve_times=False)
+    s._process_file(img, DestinationIndex())
+
+    copied = dst / f"{hashlib.sha1(data[:64]).hexdigest()[:12]}.jpg"
+    assert copied.read_bytes() == JPEG[:-2] + body + b"\xff\xd9"
+    assert copied.stat().st_mtime_ns != 1_000_000_000
+
+
+def test_process_file_skips_kernel_copy_across_filesystems(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.mkdir()
+    assert sanitizer._same_filesystem(src, dst / "missing")
+    dst.mkdir()
+    img = src / "img.jpg"
+    img.write_bytes(JPEG)
+
+    def boom(*args, **kwargs):
+        raise AssertionError("copy_file_range should not be attempted")
+
+    monkeypatch.setattr(sanitizer, "_same_filesystem", lambda source, dest: False)
+    monkeypatch.setattr(os, "copy_file_range", boom, raising=False)
+
+    s = Sanitizer(src, dst, worker=1, hash_sample_size=4)
+    s._process_file(img, DestinationIndex())
+
+    assert s.report.copied == 1
+    assert (dst / f"{hashlib.sha1(JPEG[:4]).hexdigest()[:12]}.jpg").read_bytes() == JPEG
+
+
+def test_process_file_hashes_known_size_before_copying(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    img = src / "renamed.jpg"
+    img.write_bytes(JPEG)
+
+    def boom(*args):
+        raise AssertionError("duplicate should not be copied")
+
+    monkeypatch.setattr(Sanitizer, "_hash_and_copy", boom)
+    monkeypatch.setattr(Sanitizer, "_copy_image", boom)
+
+    s = Sanitizer(src, dst, worker=1, hash_sample_size=None)
+    index = DestinationIndex(
+        existing_hashes=frozenset({hashlib.sha1(JPEG).hexdigest()[:12]}),
+        known_sizes=frozenset({len(JPEG)}),
+    )
+    s._process_file(img, index)
+
+    assert s.report.ignored == 1
+
+
+def test_process_file_keeps_cache_between_hash_and_copy(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    img = src / "img.jpg"
+    img.write_bytes(JPEG)
+
+    advice: list[tuple[str, str]] = []
+
+    def record(f, advice_name):
+        advice.append((Path(f.name).name, advice_name))
+
+    monkeypatch.setattr(sanitizer, "_fadvise", record)
+
+    s = Sanitizer(src, dst, worker=1, hash_sample_size=5)
+    s._process_file(img, DestinationIndex())
+
+    assert s.report.copied == 1
+    # the pages are dropped after the copy, not after the hash pass
+    assert [name for path, name in advice if path == "img.jpg"] == [
+        "POSIX_FADV_SEQUENTIAL",
+        "POSIX_FADV_SEQUENTIAL",
+        "POSIX_FADV_DONTNEED",
+    ]
+
+
+def test_process_file_creates_each_destination_dir_once(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    (src / "a").mkdir(parents=True)
+    dst.mkdir()
+    for name in ("one", "two"):
+        (src / "a" / f"{name}.jpg").write_bytes(JPEG + name.encode())
+
+    created = []
+    mkdir = Path.mkdir
+
+    def tracking_mkdir(self, *args, **kwargs):
+        created.append(self)
+        mkdir(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "mkdir", tracking_mkdir)
+
+    s = Sanitizer(src, dst, worker=1, hash_sample_size=None)
+    for img in sorted((src / "a").iterdir()):
+        s._process_file(img, DestinationIndex())
+
+    assert s.report.copied == 2
+    assert created == [dst / "a"]
+
+
+def test_hash_and_copy_hashes_data_after_early_eoi(tmp_path):
+    s = Sanitizer(tmp_path, tmp_path / "dst", worker=1, hash_sample_size=None)
+    digests = set()
+    for name in ("A", "B"):
+        img = tmp_path / f"{name}.jpg"
+        img.write_bytes(b"\xff\xd8\xff\xd9trailing-" + name.encode())
+
+        digest = s._hash_and_copy(img, tmp_path / f"{name}.out")
+
+        assert digest == s._hash_file(img)
+        assert (tmp_path / f"{name}.out").read_bytes() == b"\xff\xd8\xff\xd9"
+        digests.add(digest)
+
+    assert len(digests) == 2